@@ -0,0 +1,163 @@
+import os
+import re
+import atexit
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+from db_setup import configure_conn
+
+# A LIMIT clause ending the query; LIMITs in subqueries or literals don't count
+TRAILING_LIMIT = re.compile(r'\bLIMIT\s+\d+(\s*(,|OFFSET)\s*\d+)?\s*;?\s*$', re.IGNORECASE)
+
+class ConnectionPool:
+    """One writer and a queue of read-only connections sharing a WAL database"""
+
+    def __init__(self, db_path, readers=None, in_memory=False):
+        self.writer_lock = threading.Lock()
+        self.readers = queue.Queue()
+        if in_memory:
+            # Read-only demo mode: copy the file into a shared in-memory database,
+            # kept alive by memory_conn, and serve every read from there
+            self.writer_conn = None
+            reader_uri = f"file:uslq_{os.path.basename(db_path)}?mode=memory&cache=shared"
+            self.memory_conn = sqlite3.connect(reader_uri, uri=True, check_same_thread=False)
+            disk_conn = sqlite3.connect(db_path)
+            disk_conn.backup(self.memory_conn)
+            disk_conn.close()
+        else:
+            # The writer is opened first so the file is in WAL mode before readers attach
+            self.writer_conn = configure_conn(sqlite3.connect(
+                db_path, check_same_thread=False, isolation_level='IMMEDIATE'))
+            reader_uri = f"file:{db_path}?mode=ro"
+        for _ in range(readers or os.cpu_count() or 1):
+            conn = sqlite3.connect(reader_uri, uri=True,
+                                   check_same_thread=False, isolation_level=None)
+            # The database is small, so keep all of it mapped and in the page cache
+            configure_conn(conn, cache_size=-65536)
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute("PRAGMA query_only=1")
+            self.readers.put(conn)
+        atexit.register(self.close)
+
+    def close(self):
+        """Refresh planner statistics and close every connection"""
+        atexit.unregister(self.close)
+        # Readers go first so the writer is the last connection and can
+        # checkpoint and remove the -wal/-shm files
+        while not self.readers.empty():
+            self.readers.get().close()
+        if self.writer_conn is None:
+            self.memory_conn.close()
+        else:
+            with self.writer_lock:
+                # Queries run on the readers, so PRAGMA optimize on the writer would
+                # skip every table; a bounded ANALYZE covers all of them instead
+                self.writer_conn.execute("PRAGMA analysis_limit=400")
+                self.writer_conn.execute("ANALYZE")
+                self.writer_conn.close()
+
+    @contextmanager
+    def reader(self):
+        """Check a read-only connection out of the pool"""
+        conn = self.readers.get()
+        try:
+            yield conn
+        finally:
+            self.readers.put(conn)
+
+    @contextmanager
+    def writer(self):
+        """Hold the writer connection, committing on success"""
+        if self.writer_conn is None:
+            raise sqlite3.OperationalError("database is in read-only in-memory mode")
+        with self.writer_lock:
+            try:
+                yield self.writer_conn
+                self.writer_conn.commit()
+            except Exception:
+                self.writer_conn.rollback()
+                raise
+
+@st.cache_resource
+def get_pool(db_path):
+    """Connection pool shared across reruns and sessions"""
+    # Set USLQ_IN_MEMORY=1 to serve a read-only copy of the database from memory
+    return ConnectionPool(db_path, in_memory=os.getenv("USLQ_IN_MEMORY") == "1")
+
+@st.cache_data(show_spinner=False)
+def _load_table_schema(db_path, mtime):
+    """Read schema information from disk; mtime is only part of the cache key"""
+    # Errors propagate so that a failed read is not cached
+    with get_pool(db_path).reader() as conn:
+        # All tables and their columns in a single query
+        rows = conn.execute("""
+            SELECT m.name, p.name, p.type
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+            ORDER BY m.name, p.cid
+        """).fetchall()
+    
+    schema_info = {}
+    for table_name, column, column_type in rows:
+        schema_info.setdefault(table_name, []).append(f"{column} ({column_type})")
+    
+    return schema_info
+
+def get_table_schema(db_path):
+    """Get schema information for all tables in the database"""
+    try:
+        # Cached per file modification time so schema changes are picked up;
+        # in WAL mode recent writes only touch the -wal file
+        mtime = os.path.getmtime(db_path)
+        if os.path.exists(db_path + "-wal"):
+            mtime = max(mtime, os.path.getmtime(db_path + "-wal"))
+        return _load_table_schema(db_path, mtime)
+    except Exception as e:
+        st.error(f"Error getting schema: {str(e)}")
+        return {}
+
+def validate_sql(sql, conn):
+    """Compile the query without running it, raising if it is invalid"""
+    # EXPLAIN only prepares the statement and never leaves partial changes behind
+    conn.execute("EXPLAIN " + sql).fetchall()
+
+def execute_sql_query(sql, db_path, row_limit=None):
+    """Execute the SQL query and return results"""
+    try:
+        sql_type = sql.strip().upper().split()[0]
+        
+        if sql_type == 'SELECT':
+            limited = row_limit and not TRAILING_LIMIT.search(sql)
+            if limited:
+                # On its own line so a trailing -- comment cannot swallow it
+                sql = f"{sql.strip().rstrip(';')}\nLIMIT {row_limit}"
+            with get_pool(db_path).reader() as conn:
+                validate_sql(sql, conn)
+                df = pd.read_sql_query(sql, conn)
+            message = 'Query executed successfully'
+            if limited and len(df) == row_limit:
+                message += f' (showing the first {row_limit} rows)'
+            # Styling is applied once by the page CSS rather than per cell
+            return {'success': True, 'data': df, 'message': message}
+        else:
+            # Validate on the writer: a reader's EXPLAIN can see a stale schema
+            with get_pool(db_path).writer() as conn:
+                validate_sql(sql, conn)
+                cursor = conn.cursor()
+                cursor.execute(sql)
+            if sql_type == 'INSERT':
+                return {'success': True, 'message': f'Successfully inserted {cursor.rowcount} row(s)'}
+            elif sql_type == 'UPDATE':
+                return {'success': True, 'message': f'Successfully updated {cursor.rowcount} row(s)'}
+            elif sql_type == 'DELETE':
+                return {'success': True, 'message': f'Successfully deleted {cursor.rowcount} row(s)'}
+            elif sql_type in ['CREATE', 'ALTER', 'DROP']:
+                return {'success': True, 'message': 'Schema modification completed successfully'}
+            
+    except sqlite3.OperationalError as e:
+        return {'success': False, 'error': f"Database error: {str(e)}"}
+    except Exception as e:
+        return {'success': False, 'error': f"Unexpected error: {str(e)}"}
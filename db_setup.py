@@ -0,0 +1,54 @@
+import sqlite3
+
+def configure_conn(connection, cache_size=-20000):
+    """Apply the PRAGMAs used for every connection to the database"""
+    # journal_mode persists in the file; the rest are per-connection settings
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    connection.execute(f"PRAGMA cache_size={int(cache_size)}")
+    connection.execute("PRAGMA temp_store=MEMORY")
+    connection.execute("PRAGMA foreign_keys=ON")
+    return connection
+
+def init_database():
+    connection = sqlite3.connect("student.db")
+    configure_conn(connection)
+    cursor = connection.cursor()
+    
+    # Drop existing tables instead of deleting the file, which would pull it
+    # (and its -wal/-shm files) out from under a running app
+    cursor.execute("PRAGMA foreign_keys=OFF")
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+    for (table_name,) in cursor.fetchall():
+        cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    cursor.execute("PRAGMA foreign_keys=ON")
+    
+    # Create table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS STUDENT(
+        NAME VARCHAR(25), 
+        CLASS VARCHAR(25), 
+        SECTION VARCHAR(25), 
+        MARKS INT
+    )
+    """)
+    
+    # Insert sample data
+    sample_data = [
+        ('Krish', 'Data Science', 'A', 90),
+        ('Manohar', 'Machine Learning', 'A', 90),
+        ('Abhinav', 'Python', 'A', 90),
+        ('Aneesh', 'SQL', 'A', 90),
+        ('Rahul', 'FCS', 'A', 90)
+    ]
+    
+    # Single multi-row statement so it is prepared and bound only once
+    sql = "INSERT INTO STUDENT VALUES " + ",".join(["(?,?,?,?)"] * len(sample_data))
+    with connection:
+        cursor.execute(sql, [value for row in sample_data for value in row])
+    # Let the query planner gather statistics for the new data; PRAGMA optimize
+    # would skip tables this connection has not queried
+    cursor.execute("ANALYZE")
+    connection.close()
+    print("Database initialized successfully!")
@@ -1,42 +1,55 @@
 import os
-import sqlite3
-import pandas as pd
+import json
+import hashlib
+import functools
 import streamlit as st
 import google.generativeai as genai
 from dotenv import load_dotenv
+from db import get_table_schema, execute_sql_query
 
-load_dotenv()
-genai.configure(api_key = os.getenv("GOOGLE_API_KEY"))
+@st.cache_resource
+def _init_genai():
+    """Configure Gemini and create the model once rather than on every rerun"""
+    load_dotenv()
+    genai.configure(api_key = os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel('gemini-pro')
 
-def get_table_schema(db_path):
-    """Get schema information for all tables in the database"""
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
-        
-        schema_info = {}
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"PRAGMA table_info({table_name});")
-            columns = cursor.fetchall()
-            schema_info[table_name] = [f"{col[1]} ({col[2]})" for col in columns]
-        
-        return schema_info
-    except Exception as e:
-        st.error(f"Error getting schema: {str(e)}")
-        return {}
-    finally:
-        conn.close()
+MODEL = _init_genai()
+
+# Up to this many tables the full schema is sent with the question and no
+# table identification is done at all
+MULTI_TABLE_THRESHOLD = 3
+
+# Above this many tables the schema is too large to send in a single prompt,
+# so tables are identified first and only their schema is sent
+ONE_SHOT_MAX_TABLES = 8
+
+# SELECT queries without a LIMIT are capped at this many rows unless disabled in the UI
+ROW_LIMIT = 10000
+
+def get_schema_key(schema_info):
+    """Stable fingerprint of schema information, used as a cache key"""
+    return hashlib.sha1(json.dumps(schema_info, sort_keys=True).encode()).hexdigest()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _generate_text(kind, question, schema_key, _prompt, _parse):
+    """Send a prompt to Gemini, caching the parsed response per question and schema"""
+    # The prompt and parser are fully determined by the other arguments, so
+    # they are not hashed. Parsing happens here so a response that fails to
+    # parse raises and is not cached.
+    response = MODEL.generate_content(_prompt)
+    return _parse(response.text)
 
 
-def identify_relevant_tables(question):
+def _parse_tables(text):
+    """Split a comma-separated list of table names"""
+    return [table.strip() for table in text.split(',')]
+
+def identify_relevant_tables(question, full_schema):
     """Step 1: Identify relevant tables from the question"""
     try:
         # Get all available tables
-        available_tables = list(get_table_schema("student.db").keys())
+        available_tables = list(full_schema.keys())
         
         prompt = f"""
         Given the following question, identify which database tables might be needed to answer it.
@@ -46,12 +59,11 @@ def identify_relevant_tables(question):
         Question: {question}
         """
         
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt)
-        tables = [table.strip() for table in response.text.split(',')]
+        tables = _generate_text('tables', question, get_schema_key(full_schema), prompt,
+                                _parse_tables)
         
-        # Validate that returned tables actually exist
-        valid_tables = [table for table in tables if table in available_tables]
+        # Validate that returned tables actually exist (dict membership is O(1))
+        valid_tables = [table for table in tables if table in full_schema]
         if not valid_tables:
             return available_tables  # Return all tables if no valid ones identified
         return valid_tables
@@ -59,13 +71,31 @@ def identify_relevant_tables(question):
         st.error(f"Error identifying tables: {str(e)}")
         return []
 
+@functools.lru_cache(maxsize=32)
+def _schema_prompt(schema_key, schema_json):
+    """Format serialized schema information, once per schema fingerprint"""
+    parts = ["Database Schema:"]
+    parts.extend(f"Table: {table}\nColumns: {', '.join(columns)}"
+                 for table, columns in json.loads(schema_json).items())
+    return "\n".join(parts) + "\n"
+
+def clean_sql_query(text):
+    """Strip formatting from a generated query and check it looks like SQL"""
+    clean_query = text.strip()
+    clean_query = clean_query.replace('```sql', '').replace('```', '')
+    clean_query = ' '.join(clean_query.split())
+    
+    # Validate basic SQL syntax
+    if not any(clean_query.upper().startswith(keyword) for keyword in 
+              ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'ALTER', 'DROP']):
+        raise ValueError("Invalid SQL query generated")
+    return clean_query
+
 def generate_sql_query(question, schema_info):
-    """Step 2: Generate SQL query using the schema information"""
+    """Generate SQL query using the schema information"""
     try:
-        schema_prompt = "Database Schema:\n"
-        for table, columns in schema_info.items():
-            schema_prompt += f"Table: {table}\n"
-            schema_prompt += f"Columns: {', '.join(columns)}\n"
+        schema_key = get_schema_key(schema_info)
+        schema_prompt = _schema_prompt(schema_key, json.dumps(schema_info))
         
         prompt = f"""
         You are an expert in converting English questions to SQL queries.
@@ -81,69 +111,63 @@ def generate_sql_query(question, schema_info):
         Question: {question}
         """
         
-        model = genai.GenerativeModel('gemini-pro')
-        response = model.generate_content(prompt)
-        
-        # Clean the response
-        clean_query = response.text.strip()
-        clean_query = clean_query.replace('```sql', '').replace('```', '')
-        clean_query = ' '.join(clean_query.split())
-        
-        # Validate basic SQL syntax
-        if not any(clean_query.upper().startswith(keyword) for keyword in 
-                  ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'ALTER', 'DROP']):
-            raise ValueError("Invalid SQL query generated")
-            
-        return clean_query
+        return _generate_text('sql', question, schema_key, prompt, clean_sql_query)
     except Exception as e:
         st.error(f"Error generating query: {str(e)}")
         return None
 
-def execute_sql_query(sql, db_path):
-    """Execute the SQL query and return results"""
-    conn = None
+def _parse_one_shot(text):
+    """Parse the JSON answer to the one-shot prompt into tables and SQL"""
+    text = text.strip().replace('```json', '').replace('```', '')
+    result = json.loads(text)
+    return result.get('tables', []), clean_sql_query(result['sql'])
+
+def generate_sql_one_shot(question, full_schema):
+    """Identify relevant tables and generate the SQL query in a single request"""
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        schema_key = get_schema_key(full_schema)
+        schema_prompt = _schema_prompt(schema_key, json.dumps(full_schema))
         
-        sql_type = sql.strip().upper().split()[0]
+        prompt = f"""
+        You are an expert in converting English questions to SQL queries.
+        {schema_prompt}
         
-        if sql_type == 'SELECT':
-            df = pd.read_sql_query(sql, conn)
-            # Reset index and format the dataframe
-            # df = df.reset_index(drop=True)
-            return {
-                'success': True, 
-                'data': df.style.set_properties(**{
-                    'background-color': '#080808',
-                    'border': '1px solid black',
-                    'padding': '5px'
-                }), 
-                'message': 'Query executed successfully'
-            }
-        else:
-            cursor.execute(sql)
-            conn.commit()
-            if sql_type == 'INSERT':
-                return {'success': True, 'message': f'Successfully inserted {cursor.rowcount} row(s)'}
-            elif sql_type == 'UPDATE':
-                return {'success': True, 'message': f'Successfully updated {cursor.rowcount} row(s)'}
-            elif sql_type == 'DELETE':
-                return {'success': True, 'message': f'Successfully deleted {cursor.rowcount} row(s)'}
-            elif sql_type in ['CREATE', 'ALTER', 'DROP']:
-                return {'success': True, 'message': 'Schema modification completed successfully'}
-            
-    except sqlite3.OperationalError as e:
-        return {'success': False, 'error': f"Database error: {str(e)}"}
+        Rules:
+        1. Return ONLY a JSON object of the form {{"tables": [...], "sql": "..."}}
+           where "tables" lists the tables needed to answer the question
+           and "sql" is the SQL query
+        2. For CREATE TABLE queries, add IF NOT EXISTS
+        3. For INSERT queries, use single quotes for string values
+        4. For SELECT queries, ensure proper JOIN conditions if multiple tables
+        5. Ensure proper WHERE clause formatting
+        
+        Question: {question}
+        """
+        
+        tables, sql_query = _generate_text('one_shot', question, schema_key, prompt,
+                                           _parse_one_shot)
+        
+        # Validate that returned tables actually exist
+        valid_tables = [table for table in tables if table in full_schema]
+        if not valid_tables:
+            valid_tables = list(full_schema)  # Fall back to all tables
+        return valid_tables, sql_query
     except Exception as e:
-        return {'success': False, 'error': f"Unexpected error: {str(e)}"}
-    finally:
-        if conn:
-            conn.close()
+        st.error(f"Error generating query: {str(e)}")
+        return list(full_schema), None
 
 # Streamlit UI
 st.set_page_config(page_title="Natural Language to SQL")
 st.header("Natural Language to SQL Query Generator")
+st.markdown("""
+<style>
+[data-testid="stDataFrame"] {
+    background-color: #080808;
+    border: 1px solid black;
+    padding: 5px;
+}
+</style>
+""", unsafe_allow_html=True)
 
 if not os.path.exists("student.db"):
     st.error("Database not found! Please run 'python init_db.py' first.")
@@ -151,28 +175,43 @@ if not os.path.exists("student.db"):
 
 db_path = "student.db"
 question = st.text_input("Enter your question:", key="input")
+limit_rows = st.checkbox(f"Limit results to {ROW_LIMIT} rows", value=True)
 
 if st.button("Execute"):
     if not question:
         st.warning("Please enter a question")
     else:
         with st.spinner("Processing..."):
-            # Step 1: Identify relevant tables
-            relevant_tables = identify_relevant_tables(question)
+            full_schema = get_table_schema(db_path)
+            multi_table_mode = len(full_schema) > MULTI_TABLE_THRESHOLD
+            if not full_schema:
+                # No tables (or the schema could not be read), so don't ask Gemini
+                relevant_tables, sql_query = [], None
+            elif not multi_table_mode:
+                # Small schema, so send all of it rather than identifying tables
+                relevant_tables = list(full_schema)
+                sql_query = generate_sql_query(question, full_schema)
+            elif len(full_schema) <= ONE_SHOT_MAX_TABLES:
+                # Identify tables and generate SQL in the same request
+                relevant_tables, sql_query = generate_sql_one_shot(question, full_schema)
+            else:
+                # Step 1: Identify relevant tables
+                relevant_tables = identify_relevant_tables(question, full_schema)
+                
+                # Step 2: Generate SQL query from only their schema; it needs the
+                # answer to step 1, so the two requests cannot overlap
+                schema_info = {table: full_schema[table] for table in relevant_tables}
+                sql_query = generate_sql_query(question, schema_info) if relevant_tables else None
+            
             if relevant_tables:
                 st.info("Relevant tables identified: " + ", ".join(relevant_tables))
                 
-                # Get schema information
-                schema_info = {table: get_table_schema(db_path).get(table, []) 
-                             for table in relevant_tables}
-                
-                # Step 2: Generate SQL query
-                sql_query = generate_sql_query(question, schema_info)
                 if sql_query:
                     st.code(sql_query, language="sql")
                     
                     # Execute query
-                    result = execute_sql_query(sql_query, db_path)
+                    result = execute_sql_query(sql_query, db_path,
+                                               row_limit=ROW_LIMIT if limit_rows else None)
                     
                     if result['success']:
                         if 'data' in result: